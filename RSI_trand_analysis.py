@@ -1,7 +1,7 @@
-from flask import Flask, render_template, request
-import yfinance as yf
+from flask import Blueprint, render_template, request
 import pandas as pd
 import numpy as np
+from timeframe import TIMEFRAMES, DownloadError, is_intraday, load_bars, timeframe_label
 
 # 创建蓝图对象，名字可以自定义，比如 rsi_bp
 rsi_bp = Blueprint('rsi_bp', __name__)
@@ -33,7 +33,7 @@ def compute_rsi(series, period=14):
     rsi = 100 - (100 / (1 + rs))
     return rsi
 
-@app.route('/', methods=['GET', 'POST'])
+@rsi_bp.route('/', methods=['GET', 'POST'])
 def index():
     results = []
     total_wins = 0  # 胜利次数
@@ -41,7 +41,19 @@ def index():
 
     if request.method == 'POST':
         ticker = request.form['ticker']
-        df = yf.download(ticker, start="2020-01-01", end="2025-02-22")
+        timeframe = request.form.get('timeframe', '1d')
+        if timeframe not in TIMEFRAMES:
+            return render_template('index.html', timeframes=TIMEFRAMES, error="不支持的K线周期。")
+        names = TIMEFRAMES[timeframe]
+        bar, count, step = names["bar"], names["count"], names["step"]
+        # 日内周期只能取到最近 60 天的数据，使用其全部可用区间
+        try:
+            if is_intraday(timeframe):
+                df = load_bars(ticker, timeframe)
+            else:
+                df = load_bars(ticker, timeframe, start="2020-01-01", end="2025-02-22")
+        except DownloadError as e:
+            return render_template('index.html', timeframes=TIMEFRAMES, error=str(e))
         df.dropna(inplace=True)
         df['RSI'] = compute_rsi(df['Close'], period=6)
 
@@ -94,21 +106,21 @@ def index():
                 print(f"RSI突破日: {cross_date}, 突破时收盘价: {cross_price}, 上涨持续天数: {up_days}, 这段时间内最高价: {peak_price}, 转跌日: {turn_down_date}, 转跌日收盘价: {turn_down_price}, 跌幅: {drop_percentage:.2f}%" if drawdown_3d is not None else "转跌后3天回调幅度: 无")
 
                 results.append({
-                    "RSI突破日": cross_date,
+                    f"RSI突破{bar}": cross_date,
                     "突破时收盘价": f"{cross_price.item():.2f}",  # 提取单个值并保留两位小数
-                    "上涨持续天数": up_days,
+                    f"上涨持续{count}数": up_days,
                     "这段时间内最高收盘价": f"{peak_price.item():.2f}",  # 提取单个值并保留两位小数
-                    "转跌日": turn_down_date,
-                    "转跌日收盘价": f"{turn_down_price:.2f}" if turn_down_price is not None else None,  # 直接使用浮点数并保留两位小数
-                    "转跌日当天跌幅": f"<span class='{'positive' if drop_percentage > 0 else 'negative'}'>{drop_percentage:.2f}%</span>" if drop_percentage is not None else None,  # 涨幅百分比
-                    "转跌后3天回调幅度(正涨负跌)": f"<span class='{'positive' if (drawdown_3d * 100) > 0 else 'negative'}'>{(drawdown_3d * 100):.2f}%</span>" if drawdown_3d is not None else None,  # 转换为百分比并保留两位小数
-                    "T日收盘价": f"{t_close_price:.2f}",  # T 日收盘价
-                    "T+1日收盘价": f"{t_plus_prices[0]:.2f}" if t_plus_prices[0] is not None else None,  # T+1 日收盘价
-                    "T+1日涨跌幅": f"<span class='{'positive' if t_plus_changes[0] > 0 else 'negative'}'>{t_plus_changes[0]:.2f}%</span>" if t_plus_changes[0] is not None else None,  # T+1 日涨跌幅
-                    "T+2日涨跌幅": f"<span class='{'positive' if t_plus_changes[1] > 0 else 'negative'}'>{t_plus_changes[1]:.2f}%</span>" if t_plus_changes[1] is not None else None,  # T+2 日涨跌幅
-                    "T+3日涨跌幅": f"<span class='{'positive' if t_plus_changes[2] > 0 else 'negative'}'>{t_plus_changes[2]:.2f}%</span>" if t_plus_changes[2] is not None else None,  # T+3 日涨跌幅
-                    "T+4日涨跌幅": f"<span class='{'positive' if t_plus_changes[3] > 0 else 'negative'}'>{t_plus_changes[3]:.2f}%</span>" if t_plus_changes[3] is not None else None,  # T+4 日涨跌幅
-                    "T+5日涨跌幅": f"<span class='{'positive' if t_plus_changes[4] > 0 else 'negative'}'>{t_plus_changes[4]:.2f}%</span>" if t_plus_changes[4] is not None else None,  # T+5 日涨跌幅
+                    f"转跌{bar}": turn_down_date,
+                    f"转跌{bar}收盘价": f"{turn_down_price:.2f}" if turn_down_price is not None else None,  # 直接使用浮点数并保留两位小数
+                    f"转跌{bar}当{count}跌幅": f"<span class='{'positive' if drop_percentage > 0 else 'negative'}'>{drop_percentage:.2f}%</span>" if drop_percentage is not None else None,  # 涨幅百分比
+                    f"转跌后3{count}回调幅度(正涨负跌)": f"<span class='{'positive' if (drawdown_3d * 100) > 0 else 'negative'}'>{(drawdown_3d * 100):.2f}%</span>" if drawdown_3d is not None else None,  # 转换为百分比并保留两位小数
+                    f"T{step}收盘价": f"{t_close_price:.2f}",  # T 日收盘价
+                    f"T+1{step}收盘价": f"{t_plus_prices[0]:.2f}" if t_plus_prices[0] is not None else None,  # T+1 日收盘价
+                    f"T+1{step}涨跌幅": f"<span class='{'positive' if t_plus_changes[0] > 0 else 'negative'}'>{t_plus_changes[0]:.2f}%</span>" if t_plus_changes[0] is not None else None,  # T+1 日涨跌幅
+                    f"T+2{step}涨跌幅": f"<span class='{'positive' if t_plus_changes[1] > 0 else 'negative'}'>{t_plus_changes[1]:.2f}%</span>" if t_plus_changes[1] is not None else None,  # T+2 日涨跌幅
+                    f"T+3{step}涨跌幅": f"<span class='{'positive' if t_plus_changes[2] > 0 else 'negative'}'>{t_plus_changes[2]:.2f}%</span>" if t_plus_changes[2] is not None else None,  # T+3 日涨跌幅
+                    f"T+4{step}涨跌幅": f"<span class='{'positive' if t_plus_changes[3] > 0 else 'negative'}'>{t_plus_changes[3]:.2f}%</span>" if t_plus_changes[3] is not None else None,  # T+4 日涨跌幅
+                    f"T+5{step}涨跌幅": f"<span class='{'positive' if t_plus_changes[4] > 0 else 'negative'}'>{t_plus_changes[4]:.2f}%</span>" if t_plus_changes[4] is not None else None,  # T+5 日涨跌幅
                     "胜率": f"{(total_wins / total_games * 100):.2f}%" if total_games > 0 else "0.00%"  # 胜率百分比
                 })
 
@@ -117,6 +129,6 @@ def index():
         # 计算最终胜率
         final_win_rate = (total_wins / total_games * 100) if total_games > 0 else 0  # 最终胜率
 
-        return render_template('results.html', tables=[res_df.to_html(classes='data', index=False, escape=False)], titles=res_df.columns.values, win_rate=f"{final_win_rate:.2f}%", ticker=ticker)
+        return render_template('results.html', tables=[res_df.to_html(classes='data', index=False, escape=False)], titles=res_df.columns.values, win_rate=f"{final_win_rate:.2f}%", ticker=ticker, timeframe_label=timeframe_label(timeframe))
 
-    return render_template('index.html')
+    return render_template('index.html', timeframes=TIMEFRAMES)
@@ -3,14 +3,21 @@ import yfinance as yf
 import pandas as pd
 from datetime import datetime, timedelta
 import pytz
+from timeframe import TIMEFRAMES, DownloadError, is_intraday, load_bars, timeframe_label
 
 app = Flask(__name__)
 
-def calculate_quarterly_stats_with_breakout_and_breakdown(symbol):
-    # 下载数据：覆盖初始突破及后续统计区间
+def calculate_quarterly_stats_with_breakout_and_breakdown(symbol, timeframe="1d"):
+    # 季度统计依赖 2022-07-01 起的固定区间，日内周期只有最近 60 天数据，无法统计
+    if is_intraday(timeframe):
+        return None, f"{timeframe_label(timeframe)}周期暂不支持季度突破统计。"
+    # 获取数据：覆盖初始突破及后续统计区间
     start_date_download = "2022-07-01"
     end_date_download = "2025-02-23"
-    all_data = yf.download(symbol, start=start_date_download, end=end_date_download)
+    try:
+        all_data = load_bars(symbol, timeframe, start=start_date_download, end=end_date_download)
+    except DownloadError:
+        return None, "下载数据失败或无数据。"
     if all_data.empty:
         return None, "下载数据失败或无数据。"
     all_data.sort_index(inplace=True)
@@ -307,14 +314,17 @@ def quarterly():
     error = None
     if request.method == 'POST':
         ticker = request.form.get('ticker', '').strip().upper()
+        timeframe = request.form.get('timeframe', '1d')
         if not ticker:
             error = "股票代码不能为空。"
+        elif timeframe not in TIMEFRAMES:
+            error = "不支持的K线周期。"
         else:
-            stats, err = calculate_quarterly_stats_with_breakout_and_breakdown(ticker)
+            stats, err = calculate_quarterly_stats_with_breakout_and_breakdown(ticker, timeframe)
             if err:
                 error = err
             else:
-                result_html += f"<h2>{ticker} 的季度统计结果</h2>"
+                result_html += f"<h2>{ticker} 的季度统计结果（{timeframe_label(timeframe)}）</h2>"
                 result_html += "<table border='1' cellspacing='0' cellpadding='5'>"
                 result_html += "<tr><th>季度</th><th>市场类型</th><th>突破次数</th><th>平均突破维持天数</th><th>平均有效突破涨幅(%)</th><th>三破五</th><th>高位-8</th><th>低位-10</th></tr>"
                 for quarter in sorted(stats.keys()):
@@ -350,6 +360,11 @@ def quarterly():
       <form method="post">
         <label for="ticker">股票代码：</label>
         <input type="text" id="ticker" name="ticker" placeholder="例如: ROKU" required>
+        <select name="timeframe">
+          {% for key, tf in timeframes.items() %}
+            <option value="{{ key }}">{{ tf.label }}</option>
+          {% endfor %}
+        </select>
         <button type="submit">统计</button>
       </form>
       {% if error %}
@@ -360,7 +375,8 @@ def quarterly():
       {% endif %}
     </body>
     </html>
-    """, result_html=result_html, error=error)
+    """, result_html=result_html, error=error,
+       timeframes={key: tf for key, tf in TIMEFRAMES.items() if not is_intraday(key)})
 
 if __name__ == '__main__':
     app.run(debug=True)
@@ -2,40 +2,40 @@ from flask import Flask, render_template_string, request
 import yfinance as yf
 from datetime import datetime, timedelta
 import pytz
+from timeframe import TIMEFRAMES, bar_end, bar_in_progress, load_bars
 
 app = Flask(__name__)
 
-def calculate_values(ticker):
+def calculate_values(ticker, timeframe="1d"):
     try:
-        # 获取最近 10 天数据
-        data = yf.download(ticker, period="10d", interval="1d")
+        # 获取最近一段时间的数据
+        start = (datetime.today() - timedelta(days=TIMEFRAMES[timeframe]["lookback_days"])).strftime('%Y-%m-%d')
+        data = load_bars(ticker, timeframe, start=start)
     except Exception as e:
-        return None, None, None, None, None, None, None, f"下载数据时出错：{e}"
+        return None, None, None, None, None, None, None, None, f"下载数据时出错：{e}"
     
     # 获取当前美东时间
     eastern = pytz.timezone('US/Eastern')
     current_time = datetime.now(eastern)
     
-    # 判断市场状态：美东时间 9:30～16:00 为盘中，否则视为已收盘
-    market_open = current_time.replace(hour=9, minute=30, second=0, microsecond=0)
-    market_close = current_time.replace(hour=16, minute=0, second=0, microsecond=0)
-    if market_open <= current_time <= market_close:
+    # 判断市场状态：当前K线仍在走（日线/30分钟为美东时间 9:30～16:00，周线为周一开盘至周五收盘）为盘中，否则视为已收盘
+    if bar_in_progress(timeframe, current_time):
         market_status = "盘中"
     else:
         market_status = "已收盘"
     
-    # 根据市场状态决定是否包含今天数据
+    # 根据市场状态决定是否包含当前K线的数据
     today_str = datetime.today().strftime('%Y-%m-%d')
     if market_status == "已收盘":
         # 已收盘，包含今天数据
         data = data[data.index.strftime('%Y-%m-%d') <= today_str]
     else:
-        # 盘中，排除今天数据（数据可能不完整）
-        data = data[data.index.strftime('%Y-%m-%d') < today_str]
+        # 盘中，排除尚未走完的K线（数据可能不完整）
+        data = data[[bar_end(ts, timeframe) <= current_time for ts in data.index]]
     
-    # 至少需要 5 个交易日数据
+    # 至少需要 5 根已走完的K线
     if len(data) < 5:
-        return None, None, None, None, None, None, None, "数据不足，无法计算目标价。"
+        return None, None, None, None, None, None, None, None, "数据不足，无法计算目标价。"
     
     data = data.sort_index()
     last5 = data.iloc[-5:]
@@ -56,7 +56,7 @@ def calculate_values(ticker):
         MA3 = float(MA3)
         MA5 = float(MA5)
     except Exception:
-        return None, None, None, None, None, None, None, "无法计算 MA 指标。"
+        return None, None, None, None, None, None, None, None, "无法计算 MA 指标。"
     
     breakdown_status = "未破位" if MA3 >= MA5 else "已破位"
     
@@ -107,30 +107,35 @@ def index():
     # 初始时我们不显示预测结果
     if request.method == 'POST':
         command = request.form.get('command', '').strip()
+        timeframe = request.form.get('timeframe', '1d')
         if not command:
             error = "股票代码不能为空。"
+        elif timeframe not in TIMEFRAMES:
+            error = "不支持的K线周期。"
         else:
             ticker = command.upper()
-            X, Y, Z, current_price, last5_prices, market_status, current_time, breakdown_status, err = calculate_values(ticker)
+            X, Y, Z, current_price, last5_prices, market_status, current_time, breakdown_status, err = calculate_values(ticker, timeframe)
             if err:
                 error = err
             else:
+                names = TIMEFRAMES[timeframe]
+                current_bar, next_bar, bar_unit = names["current"], names["next"], names["unit"]
                 current_time_str = current_time.strftime('%Y-%m-%d %H:%M:%S %Z')
                 tomorrow_str = (current_time + timedelta(days=1)).strftime('%Y-%m-%d')
                 if market_status == "盘中":
                     result = (
                         f"股票: {ticker} | 当前实时价格: {current_price if current_price is not None else 'N/A'} | 时间: {current_time_str}<br>"
-                        f"过去五个交易日的情况: {', '.join([f'{price:.2f}' for price in last5_prices])}<br>"
+                        f"过去五个{bar_unit}的情况: {', '.join([f'{price:.2f}' for price in last5_prices])}<br>"
                         f"当前破位状态: {breakdown_status}<br>"
-                        f"【今日不破位收盘价】如果今天平开，预测收盘价需达到 {X:.2f}<br>"
-                        f"【明日不破位收盘价预测】预测明天收盘价需达到 {Z:.2f}"
+                        f"【{current_bar}不破位收盘价】如果{current_bar}平开，预测收盘价需达到 {X:.2f}<br>"
+                        f"【{next_bar}不破位收盘价预测】预测{next_bar}收盘价需达到 {Z:.2f}"
                     )
                 else:
                     result = (
-                        f"股票: {ticker} | 今天收盘价: {last5_prices[4]:.2f} | 时间: {current_time_str}<br>"
-                        f"过去五个交易日的情况: {', '.join([f'{price:.2f}' for price in last5_prices])}<br>"
+                        f"股票: {ticker} | 最新收盘价: {last5_prices[4]:.2f} | 时间: {current_time_str}<br>"
+                        f"过去五个{bar_unit}的情况: {', '.join([f'{price:.2f}' for price in last5_prices])}<br>"
                         f"当前破位状态: {breakdown_status}<br>"
-                        f"【明日不破位收盘价】预测明天收盘价需达到 {Y:.2f}"
+                        f"【{next_bar}不破位收盘价】预测{next_bar}收盘价需达到 {Y:.2f}"
                     )
     return render_template_string("""
     <!doctype html>
@@ -152,6 +157,11 @@ def index():
       <form method="post">
         <label for="command">请输入股票代码（大小写均可）：</label><br>
         <input type="text" id="command" name="command" placeholder="例如：PTON" required>
+        <select name="timeframe">
+          {% for key, tf in timeframes.items() %}
+            <option value="{{ key }}">{{ tf.label }}</option>
+          {% endfor %}
+        </select>
         <button type="submit">提交</button>
       </form>
       {% if error %}
@@ -162,7 +172,7 @@ def index():
       {% endif %}
     </body>
     </html>
-    """, result=result, error=error)
+    """, result=result, error=error, timeframes=TIMEFRAMES)
 
 if __name__ == '__main__':
     app.run(debug=True)
@@ -0,0 +1,203 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import timeframe
+from timeframe import DownloadError, load_bars, resample_ohlcv
+
+# 2024 年上半年的模拟日线数据
+DAILY = pd.DataFrame(
+    {
+        "Open": np.arange(130, dtype=float) + 100,
+        "High": np.arange(130, dtype=float) + 102,
+        "Low": np.arange(130, dtype=float) + 98,
+        "Close": np.arange(130, dtype=float) + 101,
+        "Volume": np.arange(130, dtype=float) * 10,
+    },
+    index=pd.bdate_range("2024-01-01", periods=130),
+)
+
+
+class FakeDownload:
+    """按 [start, end) 返回模拟数据，并记录每次调用"""
+
+    def __init__(self, data=DAILY):
+        self.data = data
+        self.calls = []
+        self.fail = False
+        # 模拟 yfinance 的日内数据窗口，早于该日期的下载返回空表
+        self.earliest = None
+
+    def __call__(self, ticker, start=None, end=None, interval="1d"):
+        self.calls.append((ticker, pd.Timestamp(start), end, interval))
+        if self.fail or (self.earliest is not None and pd.Timestamp(start) < self.earliest):
+            return pd.DataFrame()
+        index = self.data.index
+        start = pd.Timestamp(start)
+        if index.tz is not None:
+            start = start.tz_localize(index.tz)
+        mask = index >= start
+        if end is not None:
+            end = pd.Timestamp(end)
+            if index.tz is not None:
+                end = end.tz_localize(index.tz)
+            mask &= index < end
+        # 与新版 yfinance 一致，返回两层列名
+        data = self.data[mask].copy()
+        data.columns = pd.MultiIndex.from_product([data.columns, [ticker]])
+        return data
+
+
+@pytest.fixture
+def download(monkeypatch):
+    timeframe._base_cache.clear()
+    timeframe._resample_cache.clear()
+    timeframe._locks.clear()
+    fake = FakeDownload()
+    monkeypatch.setattr(timeframe.yf, "download", fake)
+    return fake
+
+
+def assert_frame_equal(left, right):
+    # 拼接后的索引不保留频率信息，只比较数据本身
+    pd.testing.assert_frame_equal(left, right, check_freq=False)
+
+
+def expected_weekly(start, end):
+    return resample_ohlcv(DAILY[(DAILY.index >= start) & (DAILY.index < end)], "W-MON")
+
+
+def test_switching_timeframe_does_not_download_again(download):
+    daily = load_bars("tsla", "1d", start="2024-01-01", end="2024-04-01")
+    weekly = load_bars("TSLA ", "1wk", start="2024-01-01", end="2024-04-01")
+
+    assert len(download.calls) == 1
+    assert list(daily.columns) == list(DAILY.columns)
+    assert_frame_equal(weekly, expected_weekly("2024-01-01", "2024-04-01"))
+
+
+def test_head_extension_invalidates_resampled_cache(download):
+    load_bars("TSLA", "1wk", start="2024-03-04", end="2024-05-01")
+    assert ("TSLA", "1wk") in timeframe._resample_cache
+
+    load_bars("TSLA", "1d", start="2024-01-01", end="2024-05-01")
+    assert ("TSLA", "1wk") not in timeframe._resample_cache
+
+    weekly = load_bars("TSLA", "1wk", start="2024-01-01", end="2024-05-01")
+    assert_frame_equal(weekly, expected_weekly("2024-01-01", "2024-05-01"))
+
+
+def test_tail_extension_matches_full_resample(download):
+    # 结束于周三，最后一根周K线尚未走完
+    load_bars("TSLA", "1wk", start="2024-01-01", end="2024-03-06")
+    weekly = load_bars("TSLA", "1wk", start="2024-01-01", end="2024-06-01")
+
+    assert_frame_equal(weekly, expected_weekly("2024-01-01", "2024-06-01"))
+    assert_frame_equal(
+        timeframe._resample_cache[("TSLA", "1wk")], expected_weekly("2024-01-01", "2024-06-01")
+    )
+
+
+def test_bounded_range_does_not_depend_on_cache(download):
+    # 起止日期都在周中：首尾两根周K线只聚合区间内的日线
+    load_bars("TSLA", "1wk", start="2024-01-01", end="2024-06-01")
+    weekly = load_bars("TSLA", "1wk", start="2024-01-10", end="2024-03-06")
+
+    assert_frame_equal(weekly, expected_weekly("2024-01-10", "2024-03-06"))
+    assert weekly.index[0] == pd.Timestamp("2024-01-08")
+
+
+def test_failed_download_is_not_cached(download):
+    download.fail = True
+    with pytest.raises(DownloadError):
+        load_bars("TSLA", "1d", start="2024-03-01", end="2024-04-01")
+    assert timeframe._base_cache == {}
+
+    download.fail = False
+    load_bars("TSLA", "1d", start="2024-03-01", end="2024-04-01")
+
+    download.fail = True
+    with pytest.raises(DownloadError):
+        load_bars("TSLA", "1d", start="2024-01-01", end="2024-05-01")
+    entry = timeframe._base_cache[("TSLA", "1d")]
+    assert entry["start"] == pd.Timestamp("2024-03-01")
+    assert entry["end"] == pd.Timestamp("2024-04-01")
+
+    download.fail = False
+    daily = load_bars("TSLA", "1d", start="2024-01-01", end="2024-05-01")
+    assert_frame_equal(daily, DAILY[(DAILY.index >= "2024-01-01") & (DAILY.index < "2024-05-01")])
+
+
+def test_intraday_start_is_clamped(download):
+    index = pd.date_range(
+        pd.Timestamp.now().normalize() - pd.Timedelta(days=3), periods=78, freq="5min", tz="America/New_York"
+    ) + pd.Timedelta(hours=9, minutes=30)
+    download.data = pd.DataFrame({"Open": 1.0, "High": 2.0, "Low": 0.5, "Close": 1.5, "Volume": 1.0}, index=index)
+
+    bars = load_bars("TSLA", "30m", start="2000-01-01")
+
+    earliest = pd.Timestamp.now().normalize() - pd.Timedelta(days=timeframe.INTRADAY_LOOKBACK_DAYS)
+    assert download.calls[0][1] >= earliest
+    assert len(bars) == 13
+    assert bars.index[0].strftime("%H:%M") == "09:30"
+
+
+def intraday_day(day, volume=1.0):
+    """某一交易日 9:30～16:00 的模拟 5 分钟数据"""
+    index = pd.date_range(day, periods=78, freq="5min", tz="America/New_York") + pd.Timedelta(hours=9, minutes=30)
+    return pd.DataFrame({"Open": 1.0, "High": 2.0, "Low": 0.5, "Close": 1.5, "Volume": volume}, index=index)
+
+
+def test_revised_overlapping_rows_rebuild_resampled_bars(download):
+    day = pd.Timestamp.now().normalize() - pd.Timedelta(days=3)
+    full = intraday_day(day)
+    # 第一次请求时只走到 11:00
+    download.data = full[full.index < full.index[0] + pd.Timedelta(minutes=90)]
+    assert load_bars("X", "30m")["Volume"].iloc[0] == 6.0
+
+    # 重新下载时 yfinance 修正了 9:30 那根 5 分钟K线的成交量
+    revised = full.copy()
+    revised.iloc[0, revised.columns.get_loc("Volume")] = 100.0
+    download.data = revised
+    bars = load_bars("X", "30m")
+
+    assert bars["Volume"].iloc[0] == 105.0
+    assert_frame_equal(bars, resample_ohlcv(revised, "30min"))
+
+
+def test_stale_intraday_cache_is_reloaded(download, monkeypatch):
+    old_day = pd.Timestamp.now().normalize() - pd.Timedelta(days=80)
+    new_day = pd.Timestamp.now().normalize() - pd.Timedelta(days=3)
+    earliest = [old_day - pd.Timedelta(days=1)]
+    monkeypatch.setattr(timeframe, "_intraday_earliest", lambda: earliest[0])
+    download.data = intraday_day(old_day)
+    load_bars("X", "30m")
+
+    # 过了 60 天，旧数据已不在 yfinance 的日内窗口内，窗口外的下载返回空表
+    earliest[0] = new_day - pd.Timedelta(days=timeframe.INTRADAY_LOOKBACK_DAYS - 3)
+    download.earliest = earliest[0]
+    download.data = pd.concat([intraday_day(old_day), intraday_day(new_day)])
+    bars = load_bars("X", "30m")
+
+    assert bars.index[0].date() == new_day.date()
+    assert timeframe._base_cache[("X", "5m")]["data"].index[0].date() == new_day.date()
+    assert_frame_equal(timeframe._resample_cache[("X", "30m")], resample_ohlcv(intraday_day(new_day), "30min"))
+
+
+def test_failed_ticker_leaves_no_lock(download):
+    download.fail = True
+    with pytest.raises(DownloadError):
+        load_bars("NOPE", "1d", start="2024-01-01")
+    assert timeframe._locks == {}
+
+
+def test_least_recently_used_series_is_evicted(download, monkeypatch):
+    monkeypatch.setattr(timeframe, "MAX_CACHED_SERIES", 2)
+    load_bars("A", "1wk", start="2024-01-01", end="2024-02-01")
+    load_bars("B", "1d", start="2024-01-01", end="2024-02-01")
+    load_bars("A", "1d", start="2024-01-01", end="2024-02-01")
+    load_bars("C", "1d", start="2024-01-01", end="2024-02-01")
+
+    assert list(timeframe._base_cache) == [("A", "1d"), ("C", "1d")]
+    assert ("A", "1wk") in timeframe._resample_cache
+    assert set(timeframe._locks) == {("A", "1d"), ("C", "1d")}
@@ -0,0 +1,320 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytz
+import yfinance as yf
+from pandas.tseries.frequencies import to_offset
+
+# 支持的K线周期：每个周期由一条基础序列（base）重采样（rule）得到
+# rule 为 None 表示直接使用基础序列
+# 页面上的称呼：bar/count/step 用于 RSI 结果表头（K线名称、持续计数单位、T+N 计数单位），
+# current/next/unit 用于三破五计算器（当前K线、下一根K线、过去五根K线的单位）
+# lookback_days 为三破五计算器向前取数据的天数，保证至少有 5 根已走完的K线
+TIMEFRAMES = {
+    "1d": {
+        "label": "日线", "base": "1d", "rule": None,
+        "bar": "日", "count": "天", "step": "日",
+        "current": "今日", "next": "明日", "unit": "交易日",
+        "lookback_days": 14,
+    },
+    "1wk": {
+        "label": "周线", "base": "1d", "rule": "W-MON",
+        "bar": "周", "count": "周", "step": "周",
+        "current": "本周", "next": "下周", "unit": "交易周",
+        "lookback_days": 70,
+    },
+    "30m": {
+        "label": "30分钟", "base": "5m", "rule": "30min",
+        "bar": "K线", "count": "根", "step": "根",
+        "current": "本根30分钟K线", "next": "下一根30分钟K线", "unit": "30分钟K线",
+        "lookback_days": 5,
+    },
+}
+
+# 日内基础序列：yfinance 只提供最近约 60 天的 5 分钟数据
+INTRADAY_BASES = {"5m"}
+INTRADAY_LOOKBACK_DAYS = 59
+
+# 最多缓存的基础序列条数，超出后淘汰最久未使用的一条及其重采样结果
+MAX_CACHED_SERIES = 64
+
+# OHLCV 聚合方式
+OHLCV_AGG = {
+    "Open": "first",
+    "High": "max",
+    "Low": "min",
+    "Close": "last",
+    "Adj Close": "last",
+    "Volume": "sum",
+}
+
+EASTERN = pytz.timezone('US/Eastern')
+
+# 基础序列缓存（按最近使用排序）：(ticker, base) -> {"data": DataFrame, "start": 已覆盖的起始日期, "end": 已覆盖的结束日期}
+_base_cache = OrderedDict()
+# 重采样缓存：(ticker, timeframe) -> DataFrame
+_resample_cache = {}
+# 每条基础序列一把锁，某只股票下载缓慢时不会阻塞其他股票的请求：(ticker, base) -> [锁, 使用中的请求数]
+# 没有缓存且无人使用的锁会被删除，因此锁的数量同样有上限
+_locks = {}
+_guard = threading.Lock()
+
+
+class DownloadError(Exception):
+    """yfinance 未返回数据（网络错误、限流或股票代码无效）"""
+
+
+def is_intraday(timeframe):
+    """判断该周期是否建立在日内基础序列之上"""
+    return TIMEFRAMES[timeframe]["base"] in INTRADAY_BASES
+
+
+def timeframe_label(timeframe):
+    return TIMEFRAMES[timeframe]["label"]
+
+
+def _intraday_earliest():
+    """yfinance 可提供日内数据的最早日期"""
+    return pd.Timestamp((datetime.now() - timedelta(days=INTRADAY_LOOKBACK_DAYS)).date())
+
+
+@contextmanager
+def _key_lock(key):
+    with _guard:
+        slot = _locks.setdefault(key, [threading.Lock(), 0])
+        slot[1] += 1
+    try:
+        with slot[0]:
+            yield
+    finally:
+        with _guard:
+            slot[1] -= 1
+            if slot[1] == 0 and key not in _base_cache:
+                del _locks[key]
+
+
+def _drop_resampled(ticker, base, since=None):
+    """
+    作废依赖某条基础序列的重采样结果
+    :param since: 从包含该时刻的K线起作废，None 表示全部作废
+    """
+    for timeframe, tf in TIMEFRAMES.items():
+        key = (ticker, timeframe)
+        if tf["base"] != base or key not in _resample_cache:
+            continue
+        cached = _resample_cache[key]
+        if since is None:
+            del _resample_cache[key]
+            continue
+        kept = cached[cached.index + to_offset(tf["rule"]) <= since]
+        if kept.empty:
+            del _resample_cache[key]
+        else:
+            _resample_cache[key] = kept
+
+
+def _drop_base(key):
+    _base_cache.pop(key, None)
+    _drop_resampled(*key)
+
+
+def _store_base(key, entry):
+    """写入基础序列缓存，超出上限时淘汰最久未使用且没有请求在用的序列"""
+    with _guard:
+        _base_cache[key] = entry
+        _base_cache.move_to_end(key)
+        for old_key in list(_base_cache):
+            if len(_base_cache) <= MAX_CACHED_SERIES:
+                break
+            if old_key == key or _locks.get(old_key, [None, 0])[1] > 0:
+                continue
+            _drop_base(old_key)
+            _locks.pop(old_key, None)
+
+
+def _download(ticker, interval, start, end=None):
+    """
+    下载一段数据；yfinance 出错时不会抛异常而是返回空表，这里统一转成 DownloadError
+    """
+    data = yf.download(ticker, start=start, end=end, interval=interval)
+    if data is None or data.empty:
+        raise DownloadError(f"{ticker} 下载数据失败或无数据。")
+    # 单只股票下载时新版 yfinance 返回 (Price, Ticker) 两层列名，这里压平为一层
+    if isinstance(data.columns, pd.MultiIndex):
+        data.columns = data.columns.get_level_values(0)
+    data = data.dropna(subset=["Close"]).sort_index()
+    if data.empty:
+        raise DownloadError(f"{ticker} 下载数据失败或无数据。")
+    return data
+
+
+def _merge(old, new):
+    data = pd.concat([old, new])
+    return data[~data.index.duplicated(keep='last')].sort_index()
+
+
+def _load_base(ticker, base, start, end):
+    """
+    取得基础序列，只下载缓存中缺失的部分
+    补数据时总与已缓存的首/尾K线重叠下载，因此返回空表一定是下载失败；
+    失败时抛出 DownloadError，缓存及其覆盖区间保持不变
+    重叠部分可能被 yfinance 修正过（如成交量），依赖它的重采样K线会从修正处起作废
+    :param start: 请求的起始日期
+    :param end: 请求的结束日期（不含），None 表示截至当前
+    """
+    key = (ticker, base)
+    entry = _base_cache.get(key)
+
+    # 日内缓存的最后一根K线已超出 yfinance 的日内数据窗口，无法再向后补，整条重新下载
+    if (entry is not None and base in INTRADAY_BASES
+            and entry["data"].index[-1].date() < _intraday_earliest().date()):
+        with _guard:
+            _drop_base(key)
+        entry = None
+
+    if entry is None:
+        data = _download(ticker, base, start, end)
+        _store_base(key, {"data": data, "start": start, "end": end})
+        return data
+
+    # 向前补数据：前缀发生变化，依赖它的重采样结果全部作废
+    if start < entry["start"]:
+        head_end = (entry["data"].index[0] + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+        head = _download(ticker, base, start, head_end)
+        entry["data"] = _merge(head, entry["data"])
+        entry["start"] = start
+        _drop_resampled(ticker, base)
+
+    # 向后补数据：从最后一根K线所在日期重新下载，覆盖可能未走完的最后一根；
+    # 截至当前的请求每次都会刷新最后一个交易日
+    if end is None or (entry["end"] is not None and end > entry["end"]):
+        tail = _download(ticker, base, entry["data"].index[-1].strftime('%Y-%m-%d'), end)
+        entry["data"] = _merge(entry["data"], tail)
+        entry["end"] = end
+        _drop_resampled(ticker, base, since=tail.index[0])
+
+    _store_base(key, entry)
+    return entry["data"]
+
+
+def resample_ohlcv(data, rule):
+    """
+    将 OHLCV 数据重采样为更大的周期（K线以区间起点标记，左闭右开）
+    """
+    agg = {col: how for col, how in OHLCV_AGG.items() if col in data.columns}
+    resampled = data.resample(rule, closed='left', label='left').agg(agg)
+    # 夜间、周末等没有成交的区间会产生空K线
+    return resampled.dropna(subset=["Close"])
+
+
+def _load_resampled(ticker, timeframe, base_data):
+    """
+    增量更新重采样缓存：只重算最后一根（可能未走完的）K线及其之后的部分
+    """
+    rule = TIMEFRAMES[timeframe]["rule"]
+    key = (ticker, timeframe)
+    cached = _resample_cache.get(key)
+
+    if cached is None or cached.empty:
+        resampled = resample_ohlcv(base_data, rule)
+    else:
+        cut = cached.index[-1]
+        tail = resample_ohlcv(base_data[base_data.index >= cut], rule)
+        resampled = pd.concat([cached[cached.index < cut], tail])
+
+    _resample_cache[key] = resampled
+    return resampled
+
+
+def _trim_resampled(bars, sliced, rule, start, end):
+    """
+    截取 [start, end) 内的重采样K线，结果与缓存已覆盖的范围无关：
+    完全落在区间内的K线直接取缓存，跨出区间首尾的K线只用区间内的基础数据重新聚合
+    """
+    offset = to_offset(rule)
+    inner_mask = bars.index >= start
+    if end is not None:
+        inner_mask &= (bars.index + offset) <= end
+    inner = bars[inner_mask]
+    if inner.empty:
+        return resample_ohlcv(sliced, rule)
+
+    edge_rows = sliced[(sliced.index < inner.index[0]) | (sliced.index >= inner.index[-1] + offset)]
+    if edge_rows.empty:
+        return inner
+    return pd.concat([resample_ohlcv(edge_rows, rule), inner]).sort_index()
+
+
+def load_bars(ticker, timeframe="1d", start=None, end=None):
+    """
+    按指定周期取得K线数据，基础序列和重采样结果均会被缓存，切换周期不会重复下载
+    :param ticker: str, 股票代码（不区分大小写）
+    :param timeframe: str, TIMEFRAMES 中的周期
+    :param start: str, 起始日期；日内周期可省略，且会被限制在 yfinance 可提供的最近 60 天内
+    :param end: str, 结束日期（不含），None 表示截至当前
+    :return: pd.DataFrame, 调用方可以自由修改的副本
+    :raises DownloadError: 需要下载的数据未能取得
+    """
+    if timeframe not in TIMEFRAMES:
+        raise ValueError(f"不支持的K线周期：{timeframe}")
+    ticker = ticker.strip().upper()
+    base = TIMEFRAMES[timeframe]["base"]
+    rule = TIMEFRAMES[timeframe]["rule"]
+
+    if base in INTRADAY_BASES:
+        earliest = _intraday_earliest()
+        start = max(pd.Timestamp(start), earliest) if start is not None else earliest
+    elif start is None:
+        raise ValueError("日线及以上周期必须指定起始日期。")
+    start = pd.Timestamp(start)
+    end = pd.Timestamp(end) if end is not None else None
+
+    with _key_lock((ticker, base)):
+        base_data = _load_base(ticker, base, start, end)
+        bars = base_data if rule is None else _load_resampled(ticker, timeframe, base_data)
+
+    # 按请求区间截取；日内数据带时区，比较时使用同一时区
+    index = base_data.index
+    if index.tz is not None:
+        start = start.tz_localize(index.tz)
+        end = end.tz_localize(index.tz) if end is not None else None
+    mask = index >= start
+    if end is not None:
+        mask &= index < end
+    sliced = base_data[mask]
+
+    if rule is None:
+        return sliced.copy()
+    return _trim_resampled(bars, sliced, rule, start, end).copy()
+
+
+def bar_end(bar_start, timeframe):
+    """
+    计算一根K线的收盘时间（美东时间）
+    :param bar_start: pd.Timestamp, K线的标记时间（区间起点）
+    """
+    if is_intraday(timeframe):
+        ts = bar_start if bar_start.tzinfo is not None else EASTERN.localize(bar_start.to_pydatetime())
+        return ts + pd.Timedelta(TIMEFRAMES[timeframe]["rule"])
+    if timeframe == "1wk":
+        # 周K线以周一标记，周五收盘时结束
+        bar_start = bar_start + pd.Timedelta(days=4)
+    close = datetime(bar_start.year, bar_start.month, bar_start.day, 16, 0)
+    return pd.Timestamp(EASTERN.localize(close))
+
+
+def bar_in_progress(timeframe, current_time):
+    """
+    判断当前时刻所在的K线是否仍在走（美东时间 9:30～16:00 视为盘中）
+    周线以周一开盘至周五收盘为一根K线
+    """
+    market_open = current_time.replace(hour=9, minute=30, second=0, microsecond=0)
+    market_close = current_time.replace(hour=16, minute=0, second=0, microsecond=0)
+    if timeframe == "1wk":
+        week_open = market_open - timedelta(days=current_time.weekday())
+        week_close = market_close + timedelta(days=4 - current_time.weekday())
+        return week_open <= current_time <= week_close
+    return market_open <= current_time <= market_close